@@ -1,9 +1,12 @@
+import asyncio
 import json
 import logging
 import os
 import platform
 import random
+import signal
 import sys
+import time
 
 import discord
 from discord.ext import commands, tasks
@@ -12,6 +15,26 @@ from discord.ext.commands import Context
 intents = discord.Intents.default()
 intents.message_content = True
 
+SNAPSHOT_VERSION = 1
+snapshot_path = os.environ.get("STATE_SNAPSHOT", "state/snapshot.json")
+snapshot_interval = float(os.environ.get("STATE_SNAPSHOT_INTERVAL", "300"))
+
+
+def write_snapshot(snapshot) -> None:
+    """
+    Serialise a snapshot to disk atomically, runs in a worker thread.
+    """
+    directory = os.path.dirname(snapshot_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{snapshot_path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(snapshot, file, separators=(",", ":"))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, snapshot_path)
+
+
 # Setup both of the loggers
 
 
@@ -80,6 +103,83 @@ class DiscordBot(commands.Bot):
         - self.bot.config # In cogs
         """
         self.logger = logger
+        # Warm-restart state: name -> (version, dump, restore) registered by cogs,
+        # and sections read from the last snapshot that no cog has claimed yet
+        self.state_providers = {}
+        self.restored_state = {}
+        # Until the last snapshot has been read, writing one would replace it with nothing
+        self.snapshot_loaded = False
+        self.snapshot_write = None
+        self.shutdown_task = None
+
+    def register_state(self, name, dump, restore, version=1) -> None:
+        """
+        Include a cog's state in the periodic snapshot and restore it right away
+        if the last snapshot has a compatible section for it.
+
+        `dump()` must return JSON-serializable data, `restore(data)` receives it back.
+        """
+        self.state_providers[name] = (version, dump, restore)
+        section = self.restored_state.pop(name, None)
+        if section is None:
+            return
+        if section.get("version") != version:
+            self.logger.info(f"Discarded '{name}' state from snapshot (version {section.get('version')}, expected {version})")
+            return
+        try:
+            restore(section["data"])
+            self.logger.info(f"Restored '{name}' state from snapshot")
+        except Exception as e:
+            self.logger.error(f"Failed to restore '{name}' state: {type(e).__name__}: {e}")
+
+    def unregister_state(self, name) -> None:
+        """
+        Stop snapshotting a cog's state. The latest state is kept in memory so a
+        reloaded cog picks up where it left off.
+        """
+        provider = self.state_providers.pop(name, None)
+        if provider is None:
+            return
+        version, dump, _ = provider
+        try:
+            self.restored_state[name] = {"version": version, "data": dump()}
+        except Exception as e:
+            self.logger.error(f"Failed to capture '{name}' state: {type(e).__name__}: {e}")
+
+    def load_snapshot(self) -> None:
+        try:
+            with open(snapshot_path, encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Failed to read state snapshot {snapshot_path}: {type(e).__name__}: {e}")
+            return
+        if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+            self.logger.info(f"Discarded state snapshot {snapshot_path} with an incompatible format")
+            return
+        self.restored_state = snapshot.get("sections", {})
+        self.logger.info(f"Loaded state snapshot from {time.time() - snapshot.get('saved_at', 0):.0f}s ago")
+
+    async def save_snapshot(self) -> None:
+        """
+        Write every registered cog's state to the snapshot file atomically.
+
+        The sections are collected on the event loop so cogs aren't read mid-update,
+        serialising and writing them happens in a worker thread.
+        """
+        # A cancelled save keeps writing in its thread, let it land before a newer one
+        if self.snapshot_write is not None and not self.snapshot_write.done():
+            await asyncio.wait([self.snapshot_write])
+        sections = dict(self.restored_state)
+        for name, (version, dump, _) in self.state_providers.items():
+            try:
+                sections[name] = {"version": version, "data": dump()}
+            except Exception as e:
+                self.logger.error(f"Failed to snapshot '{name}' state: {type(e).__name__}: {e}")
+        snapshot = {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "sections": sections}
+        self.snapshot_write = asyncio.get_running_loop().run_in_executor(None, write_snapshot, snapshot)
+        await asyncio.shield(self.snapshot_write)
 
     async def load_cogs(self) -> None:
         """
@@ -112,6 +212,21 @@ class DiscordBot(commands.Bot):
         """
         await self.wait_until_ready()
 
+    @tasks.loop(seconds=300.0)
+    async def snapshot_task(self) -> None:
+        """
+        Periodically snapshot cog state so a restart doesn't start everything cold.
+        """
+        try:
+            await self.save_snapshot()
+        except Exception as e:
+            self.logger.error(f"Failed to write state snapshot {snapshot_path}: {type(e).__name__}: {e}")
+
+    @snapshot_task.before_loop
+    async def before_snapshot_task(self) -> None:
+        # Skip the immediate first iteration, the snapshot was only just restored
+        await asyncio.sleep(snapshot_interval)
+
     async def setup_hook(self) -> None:
         """
         This will just be executed when the bot starts the first time.
@@ -123,8 +238,32 @@ class DiscordBot(commands.Bot):
             f"Running on: {platform.system()} {platform.release()} ({os.name})"
         )
         self.logger.info("-------------------")
+        self.load_snapshot()
+        self.snapshot_loaded = True
         await self.load_cogs()
         self.status_task.start()
+        self.snapshot_task.change_interval(seconds=snapshot_interval)
+        self.snapshot_task.start()
+        try:
+            # `docker stop` sends SIGTERM, close cleanly so the final snapshot gets written
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.on_sigterm)
+        except NotImplementedError:
+            pass
+
+    def on_sigterm(self) -> None:
+        # Keep a reference, the event loop only holds tasks weakly
+        if self.shutdown_task is None:
+            self.shutdown_task = asyncio.create_task(self.close())
+
+    async def close(self) -> None:
+        self.snapshot_task.cancel()
+        # close() also runs when login fails before setup_hook, keep the old snapshot then
+        if self.snapshot_loaded:
+            try:
+                await self.save_snapshot()
+            except Exception as e:
+                self.logger.error(f"Failed to write state snapshot {snapshot_path}: {type(e).__name__}: {e}")
+        await super().close()
 
     async def on_message(self, message: discord.Message) -> None:
         """
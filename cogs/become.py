@@ -1,11 +1,38 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.ext.commands import Context
 import aiohttp
+import asyncio
+import copy
+import functools
+import hashlib
+import json
 import os
+import random
+import re
+import socket
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 libretranslate_url = os.environ.get("LIBRETRANSLATE_URL", "http://localhost:5000")
+libretranslate_urls = [url.strip().rstrip("/") for url in os.environ.get("LIBRETRANSLATE_URLS", libretranslate_url).split(",") if url.strip()]
+libretranslate_concurrency = int(os.environ.get("LIBRETRANSLATE_CONCURRENCY", "4"))
+libretranslate_timeout = float(os.environ.get("LIBRETRANSLATE_TIMEOUT", "30"))
+libretranslate_probe_interval = float(os.environ.get("LIBRETRANSLATE_PROBE_INTERVAL", "30"))
+translate_debounce = float(os.environ.get("TRANSLATE_DEBOUNCE", "0.75"))
+presend_interaction_timeout = float(os.environ.get("PRESEND_INTERACTION_TIMEOUT", "2"))
+produced_registry_size = int(os.environ.get("PRODUCED_REGISTRY_SIZE", "4096"))
+produced_registry_ttl = float(os.environ.get("PRODUCED_REGISTRY_TTL", "3600"))
+translation_cache_db = os.environ.get("TRANSLATION_CACHE_DB", "state/translations.sqlite3")
+translation_cache_size = int(os.environ.get("TRANSLATION_CACHE_SIZE", "4096"))
+translation_cache_max_rows = int(os.environ.get("TRANSLATION_CACHE_MAX_ROWS", "200000"))
+translation_cache_ttl = float(os.environ.get("TRANSLATION_CACHE_TTL", str(30 * 24 * 3600)))
+translate_batch_chars = int(os.environ.get("TRANSLATE_BATCH_CHARS", "5000"))
+translate_batch_size = int(os.environ.get("TRANSLATE_BATCH_SIZE", "50"))
 
 MODES = {
     "arabic": {"target": "ar", "marker": " 🇸🇦"},
@@ -59,61 +86,695 @@ MODES = {
 }
 
 ALL_MARKERS = [m["marker"] for m in MODES.values()]
+# Suffix lookup for the marker fallback: one slice + set lookup per distinct marker length
+MARKER_SUFFIXES = frozenset(ALL_MARKERS)
+MARKER_LENGTHS = sorted({len(marker) for marker in ALL_MARKERS})
+
+# Spans that must reach the user byte-for-byte, they are swapped for placeholders before translating
+PROTECTED_PATTERN = re.compile(
+    r"```.*?```"                                            # code blocks
+    r"|`[^`\n]+`"                                           # inline code
+    r"|\[(?P<label>[^\]\n]+)\]\((?:<[^>\n]+>|[^)\s]+)\)"     # markdown links, the label is translated
+    r"|<(?:@[!&]?|#)\d+>"                                    # user, role and channel mentions
+    r"|<a?:\w+:\d+>"                                         # custom emoji
+    r"|<t:-?\d+(?::[tTdDfFR])?>"                             # timestamps
+    r"|<?https?://[^\s>]+>?"                                 # URLs
+    r"|:[a-z0-9_+-]+:"                                      # emoji shortcodes
+    r"|\d+(?:[.,:/]\d+)*%?"                                 # numbers, times and dates
+    r"|⟦\s*\d+\s*⟧",                                       # text that looks like a placeholder
+    re.DOTALL,
+)
+PLACEHOLDER = "⟦{}⟧"
+# Translation engines sometimes pad the token with spaces
+PLACEHOLDER_PATTERN = re.compile(r"⟦\s*(\d+)\s*⟧")
+LINE_BREAK_PATTERN = re.compile(r"(\s*\n\s*)")
+
+
+def mask_protected(text):
+    """
+    Replaces every protected span in `text` with a numbered placeholder.
+
+    Returns (masked text, protected spans by placeholder number).
+    """
+    protected = []
+    parts = []
+    position = 0
+
+    def keep(chunk):
+        protected.append(chunk)
+        return PLACEHOLDER.format(len(protected) - 1)
+
+    for match in PROTECTED_PATTERN.finditer(text):
+        parts.append(text[position:match.start()])
+        if match.group("label"):
+            parts += [keep("["), match.group("label"), keep(text[match.end("label"):match.end()])]
+        else:
+            parts.append(keep(match.group()))
+        position = match.end()
+    parts.append(text[position:])
+    return "".join(parts), protected
+
+
+def restore_placeholders(text, protected):
+    """
+    Puts protected spans back in place of their placeholders.
+
+    Spans whose placeholder got lost in translation are appended to the end so
+    nothing the user should see is dropped.
+    """
+    used = set()
+
+    def put_back(match):
+        index = int(match.group(1))
+        if index >= len(protected):
+            return match.group()
+        used.add(index)
+        return protected[index]
+
+    text = PLACEHOLDER_PATTERN.sub(put_back, text)
+    missing = [chunk for index, chunk in enumerate(protected) if index not in used]
+    return " ".join([text] + missing) if missing else text
+
+
+def split_segments(text):
+    """
+    Splits `text` into (protected spans, chunk) pairs, one translatable chunk per line.
+
+    Translatable lines are whole sentences with placeholders, numbered from zero per
+    line so identical lines share a cache entry. Line breaks, surrounding whitespace
+    and lines without any words come back with a protected value of None and are used
+    as is. Restoring every chunk and joining them gives back `text` exactly.
+    """
+    masked, protected = mask_protected(text)
+    segments = []
+    for part in LINE_BREAK_PATTERN.split(masked):
+        core = part.strip()
+        if not core or not any(char.isalpha() for char in PLACEHOLDER_PATTERN.sub("", core)):
+            segments.append((None, PLACEHOLDER_PATTERN.sub(lambda match: protected[int(match.group(1))], part)))
+            continue
+        start = part.index(core)
+        line_protected = []
+
+        def renumber(match):
+            line_protected.append(protected[int(match.group(1))])
+            return PLACEHOLDER.format(len(line_protected) - 1)
+
+        segments += [
+            (None, part[:start]),
+            (line_protected, PLACEHOLDER_PATTERN.sub(renumber, core)),
+            (None, part[start + len(core):]),
+        ]
+    return [(line_protected, chunk) for line_protected, chunk in segments if chunk]
+
+class RevisionRegistry:
+    """
+    Bounded set of keys that expire after `ttl` seconds, oldest evicted first.
+    """
+
+    def __init__(self, size, ttl) -> None:
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def add(self, key) -> None:
+        self.entries[key] = time.monotonic() + self.ttl
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        expires = self.entries.get(key)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self.entries[key]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class TranslationCache:
+    """
+    Two-tier translation cache keyed by (source, target, text hash).
+
+    An in-memory LRU sits in front of a SQLite table so repeated bot strings skip
+    LibreTranslate entirely, even across restarts. Entries expire after `ttl`
+    seconds and the table is pruned to `max_rows`. SQLite runs on one worker thread.
+    """
+
+    def __init__(self, path, memory_size, max_rows, ttl) -> None:
+        self.path = path
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.memory = OrderedDict()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="translation-cache")
+        self.connection = None
+        self.writes_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(source, target, text):
+        return f"{source}:{target}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    async def run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, translated TEXT, created_at REAL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS translations_created ON translations (created_at)")
+        connection.commit()
+        self.connection = connection
+        self._prune()
+
+    def _prune(self) -> None:
+        self.connection.execute("DELETE FROM translations WHERE created_at < ?", (time.time() - self.ttl,))
+        self.connection.execute(
+            "DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+        self.connection.commit()
+
+    async def load(self) -> None:
+        await self.run(self._open)
+
+    def _read(self, keys):
+        placeholders = ",".join("?" * len(keys))
+        rows = self.connection.execute(
+            f"SELECT key, translated, created_at FROM translations WHERE key IN ({placeholders})", keys
+        ).fetchall()
+        return {key: (translated, created_at) for key, translated, created_at in rows}
+
+    def _write(self, rows) -> None:
+        self.connection.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?)", rows)
+        self.connection.commit()
+        self.writes_since_prune += len(rows)
+        if self.writes_since_prune >= 1000:
+            self.writes_since_prune = 0
+            self._prune()
+
+    def _remember(self, key, translated, created_at) -> None:
+        self.memory[key] = (translated, created_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    async def get_many(self, source, target, texts):
+        """
+        Returns {text: translation} for every text that is cached.
+        """
+        now = time.time()
+        found = {}
+        missing = {}
+        for text in texts:
+            key = self.make_key(source, target, text)
+            entry = self.memory.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                found[text] = entry[0]
+            else:
+                missing[key] = text
+        if missing and self.connection is not None:
+            rows = await self.run(self._read, list(missing))
+            for key, (translated, created_at) in rows.items():
+                if now - created_at < self.ttl:
+                    self.disk_hits += 1
+                    found[missing.pop(key)] = translated
+                    self._remember(key, translated, created_at)
+        self.misses += len(missing)
+        return found
+
+    async def put_many(self, source, target, pairs) -> None:
+        now = time.time()
+        rows = []
+        for text, translated in pairs:
+            key = self.make_key(source, target, text)
+            self._remember(key, translated, now)
+            rows.append((key, translated, now))
+        if rows and self.connection is not None:
+            await self.run(self._write, rows)
+
+    def hit_rate(self):
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+    async def close(self) -> None:
+        if self.connection is not None:
+            await self.run(self.connection.close)
+            self.connection = None
+        self.executor.shutdown(wait=False)
+
+class TranslateBackend:
+    def __init__(self, url, concurrency) -> None:
+        self.url = url
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.healthy = True
+        self.outstanding = 0
+        self.completed = 0
+        self.failed = 0
+        self.latency = None
+        self.last_error = None
+
+    def record_latency(self, seconds) -> None:
+        self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+
+
+class TranslateBackendPool:
+    """
+    Spreads LibreTranslate requests over several backends.
+
+    Requests go to the healthy backend with the fewest outstanding requests, each
+    backend has its own concurrency limit, and connection errors or 5xx responses
+    fail over to the next backend. Plain-http service names without a domain that
+    resolve to several addresses (e.g. a scaled compose service) are expanded into
+    one backend per address on every probe, so adding replicas needs no config change.
+    Other URLs are used as configured: swapping a public hostname for an IP would
+    break TLS verification and Host-based routing.
+    """
+
+    def __init__(self, urls, concurrency, timeout) -> None:
+        self.urls = urls
+        self.concurrency = concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.backends = {url: TranslateBackend(url, concurrency) for url in urls}
+
+    async def expand(self, url):
+        parts = urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname or "." in parts.hostname or ":" in parts.hostname:
+            return [url]
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+        except OSError:
+            return [url]
+        ipv4 = sorted({info[4][0] for info in infos if info[0] == socket.AF_INET})
+        addresses = ipv4 or sorted({info[4][0] for info in infos})
+        if len(addresses) <= 1:
+            return [url]
+        expanded = []
+        for address in addresses:
+            host = f"[{address}]" if ":" in address else address
+            expanded.append(parts._replace(netloc=f"{host}:{port}").geturl())
+        return expanded
+
+    async def refresh(self, session) -> None:
+        """
+        Re-resolve the configured URLs and probe every backend's /languages endpoint.
+        """
+        urls = []
+        for url in self.urls:
+            urls += await self.expand(url)
+        self.backends = {url: self.backends.get(url) or TranslateBackend(url, self.concurrency) for url in urls}
+        await asyncio.gather(*(self.probe(session, backend) for backend in self.backends.values()))
+
+    async def probe(self, session, backend) -> None:
+        try:
+            async with session.get(f"{backend.url}/languages", timeout=aiohttp.ClientTimeout(total=5)) as response:
+                backend.healthy = response.status == 200
+                if not backend.healthy:
+                    backend.last_error = f"HTTP {response.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            backend.healthy = False
+            backend.last_error = f"{type(e).__name__}: {e}"
+
+    def ranked(self):
+        """
+        Healthy backends from least to most loaded; every backend if none are healthy.
+        """
+        candidates = [backend for backend in self.backends.values() if backend.healthy] or list(self.backends.values())
+        random.shuffle(candidates)
+        candidates.sort(key=lambda backend: backend.outstanding)
+        return candidates
+
+    async def post(self, session, path, payload):
+        """
+        POST `payload` to the best backend, failing over on errors. Returns the JSON body or None.
+        """
+        for backend in self.ranked():
+            backend.outstanding += 1
+            try:
+                async with backend.semaphore:
+                    started = time.monotonic()
+                    async with session.post(f"{backend.url}{path}", json=payload, timeout=self.timeout) as response:
+                        status = response.status
+                        data = await response.json() if status == 200 else None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                backend.failed += 1
+                backend.healthy = False
+                backend.last_error = f"{type(e).__name__}: {e}"
+                continue
+            finally:
+                backend.outstanding -= 1
+            if status >= 500:
+                backend.failed += 1
+                backend.last_error = f"HTTP {status}"
+                continue
+            if status != 200:
+                # The request itself was rejected; another backend won't do better
+                backend.failed += 1
+                backend.last_error = f"HTTP {status}"
+                return None
+            backend.completed += 1
+            backend.record_latency(time.monotonic() - started)
+            return data
+        return None
+
+    def describe(self):
+        lines = []
+        for backend in self.backends.values():
+            status = "up" if backend.healthy else "down"
+            latency = f"{backend.latency:.2f}s" if backend.latency is not None else "n/a"
+            line = f"{backend.url}: {status} | {backend.outstanding} in flight | {backend.completed} ok / {backend.failed} failed | {latency}"
+            if not backend.healthy and backend.last_error:
+                line += f" ({backend.last_error})"
+            lines.append(line)
+        return "\n".join(lines)[:1024] or "none"
+
 
 class Become(commands.Cog, name="become"):
     def __init__(self, bot) -> None:
         self.bot = bot
         self.morphed_channels = {}
+        self.translation_cache = TranslationCache(translation_cache_db, translation_cache_size, translation_cache_max_rows, translation_cache_ttl)
+        self.backends = TranslateBackendPool(libretranslate_urls, libretranslate_concurrency, libretranslate_timeout)
+        self.original_methods = {}
+        self.presend_translations = 0
+        self.fallback_edits = 0
+        self.presend_timeouts = 0
+        self.chars_seen = 0
+        self.chars_sent = 0
+        self.pending_translations = {}
+        self.processed_revisions = RevisionRegistry(produced_registry_size, produced_registry_ttl)
+        self.produced = RevisionRegistry(produced_registry_size, produced_registry_ttl)
+        self.registry_hits = 0
+        self.marker_hits = 0
+        self.translations = 0
+        self.bot_messages = 0
+        self.superseded = 0
+
+    async def cog_load(self) -> None:
+        try:
+            await self.translation_cache.load()
+        except Exception as e:
+            # The in-memory tier still works without the database
+            self.bot.logger.error(f"Failed to open translation cache at {translation_cache_db}: {type(e).__name__}: {e}")
+        self.install_send_hooks()
+        self.probe_task.change_interval(seconds=libretranslate_probe_interval)
+        self.probe_task.start()
+        self.bot.register_state("become", self.dump_state, self.restore_state)
+
+    async def cog_unload(self) -> None:
+        self.bot.unregister_state("become")
+        self.probe_task.cancel()
+        for task in self.pending_translations.values():
+            task.cancel()
+        self.remove_send_hooks()
+        await self.translation_cache.close()
+
+    def dump_state(self):
+        return {"morphed_channels": {str(channel_id): mode for channel_id, mode in self.morphed_channels.items()}}
+
+    def restore_state(self, state) -> None:
+        for channel_id, mode in state["morphed_channels"].items():
+            if mode in MODES:
+                self.morphed_channels[int(channel_id)] = mode
+
+    @tasks.loop(seconds=30.0)
+    async def probe_task(self) -> None:
+        """
+        Periodically re-resolve and health-check the LibreTranslate backends.
+        """
+        try:
+            async with aiohttp.ClientSession() as session:
+                await self.backends.refresh(session)
+        except Exception as e:
+            self.bot.logger.error(f"LibreTranslate probe failed: {type(e).__name__}: {e}")
+
+    def install_send_hooks(self) -> None:
+        """
+        Wraps the send/edit paths so output to morphed channels is translated before
+        the first API call, instead of being posted in English and edited afterwards.
+
+        Context.send covers hybrid replies to interactions, Messageable.send covers
+        channel.send/message.reply, and the edit methods cover later updates.
+        """
+        self.hook(commands.Context, "send", lambda ctx: ctx.channel)
+        self.hook(discord.abc.Messageable, "send", lambda target: getattr(target, "channel", target))
+        self.hook(discord.Message, "edit", lambda message: message.channel)
+        self.hook(discord.InteractionMessage, "edit", lambda message: message.channel)
+
+    def remove_send_hooks(self) -> None:
+        for (owner, name), original in self.original_methods.items():
+            setattr(owner, name, original)
+        self.original_methods.clear()
+
+    def hook(self, owner, name, channel_of) -> None:
+        original = owner.__dict__[name]
+        self.original_methods[(owner, name)] = original
+
+        @functools.wraps(original)
+        async def hooked(target, *args, **kwargs):
+            if args:
+                kwargs["content"], args = args[0], args[1:]
+            if isinstance(target, commands.Context) and target.interaction and not target.interaction.response.is_done():
+                # This send is the initial interaction response, which Discord wants within 3s.
+                # A slow translator must not fail the command, the edit listener translates it later.
+                try:
+                    kwargs = await asyncio.wait_for(self.presend(channel_of(target), kwargs), presend_interaction_timeout)
+                except asyncio.TimeoutError:
+                    self.presend_timeouts += 1
+            else:
+                kwargs = await self.presend(channel_of(target), kwargs)
+            result = await original(target, *args, **kwargs)
+            if isinstance(result, discord.Message) and getattr(result.channel, "id", None) in self.morphed_channels:
+                fingerprint = self.fingerprint(result.content, result.embeds)
+                if fingerprint in self.produced:
+                    self.produced.add((result.id, fingerprint))
+            return result
+
+        setattr(owner, name, hooked)
+
+    async def presend(self, channel, kwargs):
+        """
+        Returns send/edit kwargs with content and embeds translated for morphed channels.
+
+        Payloads that already carry a marker or an "i'm" footer pass through untouched,
+        which also stops nested hooks (Context.send -> Messageable.send) translating twice.
+        On failure the original payload goes out and the edit listener takes over.
+        """
+        mode = self.morphed_channels.get(getattr(channel, "id", None))
+        if mode is None:
+            return kwargs
+        content = kwargs.get("content")
+        if content is not None and content is not discord.utils.MISSING:
+            content = str(content)
+        else:
+            content = None
+        if kwargs.get("embeds"):
+            embeds = list(kwargs["embeds"])
+        elif kwargs.get("embed"):
+            embeds = [kwargs["embed"]]
+        else:
+            embeds = []
+        if not content and not embeds:
+            return kwargs
+        if self.fingerprint(content, embeds) in self.produced or self.payload_translated(content, embeds):
+            return kwargs
+        try:
+            new_content, new_embeds = await self.translate_payload(content, embeds, mode)
+        except Exception as e:
+            self.bot.logger.warning(f"Pre-send translation failed, falling back to edit: {type(e).__name__}: {e}")
+            return kwargs
+        kwargs = dict(kwargs)
+        if content:
+            kwargs["content"] = new_content
+        if kwargs.get("embeds"):
+            kwargs["embeds"] = new_embeds
+        elif kwargs.get("embed"):
+            kwargs["embed"] = new_embeds[0]
+        self.produced.add(self.fingerprint(new_content if content else None, new_embeds))
+        self.presend_translations += 1
+        return kwargs
 
     async def translate(self, text, target):
         if not text:
             return text
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{libretranslate_url}/translate", json={
-                "q": text,
-                "source": "en",
-                "target": target,
-            }) as response:
-                if response.status != 200:
-                    return text
-                data = await response.json()
-                return data.get("translatedText", text)
-
-    async def translate_embed(self, embed, mode):
+        return (await self.translate_many([text], target))[0]
+
+    async def translate_chunk(self, session, chunk, target):
+        data = await self.backends.post(session, "/translate", {
+            "q": chunk,
+            "source": "en",
+            "target": target,
+        })
+        if data is None:
+            return None
+        translated = data.get("translatedText")
+        if not isinstance(translated, list) or len(translated) != len(chunk):
+            return None
+        return translated
+
+    async def translate_many(self, texts, target):
+        """
+        Translates a list of strings line by line, keeping protected spans intact.
+
+        Code, URLs, mentions, emoji, timestamps and numbers are swapped for placeholders
+        by split_segments, so each line is translated as a whole sentence, and are put
+        back unchanged afterwards.
+        """
+        segmented = [split_segments(text) if text else None for text in texts]
+        spans = [chunk for segments in segmented if segments for protected, chunk in segments if protected is not None]
+        self.chars_seen += sum(len(text) for text in texts if text)
+        self.chars_sent += sum(len(span) for span in spans)
+        translated = dict(zip(spans, await self.translate_spans(spans, target)))
+        results = []
+        for text, segments in zip(texts, segmented):
+            if segments is None:
+                results.append(text)
+            else:
+                results.append("".join(
+                    chunk if protected is None else restore_placeholders(translated[chunk], protected)
+                    for protected, chunk in segments
+                ))
+        return results
+
+    async def translate_spans(self, texts, target):
+        """
+        Translates a list of strings with as few LibreTranslate calls as possible.
+
+        Cached and empty strings are skipped, duplicates are sent once, and the rest go
+        out as list-valued `q` requests chunked by TRANSLATE_BATCH_CHARS/TRANSLATE_BATCH_SIZE.
+        Results are scattered back in input order; strings that fail stay untranslated.
+        """
+        wanted = list(dict.fromkeys(text for text in texts if text))
+        if not wanted:
+            return list(texts)
+        results = await self.translation_cache.get_many("en", target, wanted)
+        missing = [text for text in wanted if text not in results]
+        chunks = []
+        current, current_chars = [], 0
+        for text in missing:
+            if current and (current_chars + len(text) > translate_batch_chars or len(current) >= translate_batch_size):
+                chunks.append(current)
+                current, current_chars = [], 0
+            current.append(text)
+            current_chars += len(text)
+        if current:
+            chunks.append(current)
+        if chunks:
+            async with aiohttp.ClientSession() as session:
+                translated_chunks = await asyncio.gather(*(self.translate_chunk(session, chunk, target) for chunk in chunks))
+            fresh = []
+            for chunk, translated in zip(chunks, translated_chunks):
+                if translated is not None:
+                    fresh.extend(zip(chunk, translated))
+            results.update(fresh)
+            await self.translation_cache.put_many("en", target, fresh)
+        return [results.get(text, text) if text else text for text in texts]
+
+    @staticmethod
+    def embed_strings(embed):
+        strings = [embed.title, embed.description]
+        for field in embed.fields:
+            strings += [field.name, field.value]
+        return strings
+
+    @staticmethod
+    def rebuild_embed(embed, translated, mode):
+        """
+        Builds the translated copy of `embed`, consuming its strings from the `translated` iterator.
+
+        Images, thumbnails, authors and URLs are copied over so translating before send
+        does not strip attachments such as Stable Diffusion results.
+        """
         marker = MODES[mode]["marker"]
-        target = MODES[mode]["target"]
-        new_embed = discord.Embed(
-            title=await self.translate(embed.title, target) if embed.title else embed.title,
-            description=await self.translate(embed.description, target) if embed.description else embed.description,
-            color=embed.color,
-        )
+        new_embed = discord.Embed.from_dict(copy.deepcopy(embed.to_dict()))
+        new_embed.title = next(translated)
+        new_embed.description = next(translated)
+        new_embed.clear_fields()
         for field in embed.fields:
             new_embed.add_field(
-                name=await self.translate(field.name, target),
-                value=await self.translate(field.value, target),
+                name=next(translated),
+                value=next(translated),
                 inline=field.inline,
             )
         new_embed.set_footer(text=f"i'm {mode}{marker}")
         return new_embed
 
-    def is_already_translated(self, message):
-        for marker in ALL_MARKERS:
-            if message.content and message.content.endswith(marker):
-                return True
-        for embed in message.embeds:
+    async def translate_payload(self, content, embeds, mode):
+        """
+        Translates message content and all embeds in one batched request.
+        """
+        target = MODES[mode]["target"]
+        marker = MODES[mode]["marker"]
+        self.translations += 1
+        strings = [content]
+        for embed in embeds:
+            strings += self.embed_strings(embed)
+        translated = iter(await self.translate_many(strings, target))
+        new_content = next(translated)
+        if content:
+            new_content += marker
+        new_embeds = [self.rebuild_embed(embed, translated, mode) for embed in embeds]
+        return new_content, new_embeds
+
+    @staticmethod
+    def fingerprint(content, embeds):
+        """
+        Hash of the visible text of a message, stable across the round trip through Discord.
+        """
+        state = [content or None]
+        for embed in embeds:
+            state.append([embed.title, embed.description, embed.footer.text if embed.footer else None])
+            state += [[field.name, field.value] for field in embed.fields]
+        return hashlib.sha1(json.dumps(state).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def payload_translated(content, embeds):
+        if content:
+            for length in MARKER_LENGTHS:
+                if content[-length:] in MARKER_SUFFIXES:
+                    return True
+        for embed in embeds:
             if embed.footer and embed.footer.text and embed.footer.text.startswith("i'm "):
                 return True
         return False
 
+    def is_already_translated(self, message):
+        """
+        Whether `message` is output this cog produced. The registry of produced message
+        ids and fingerprints answers in constant time; the marker heuristic covers
+        anything that has aged out of it, e.g. after a restart.
+        """
+        fingerprint = self.fingerprint(message.content, message.embeds)
+        if (message.id, fingerprint) in self.produced or fingerprint in self.produced:
+            self.registry_hits += 1
+            return True
+        if self.payload_translated(message.content, message.embeds):
+            self.marker_hits += 1
+            return True
+        return False
+
     @commands.Cog.listener()
     async def on_message(self, message):
         if message.author != self.bot.user:
             return
         if message.channel.id not in self.morphed_channels:
             return
+        self.bot_messages += 1
         if self.is_already_translated(message):
             return
-        await self.translate_message(message)
+        self.schedule_translation(message)
 
     @commands.Cog.listener()
     async def on_message_edit(self, before, after):
@@ -123,18 +784,41 @@ class Become(commands.Cog, name="become"):
             return
         if self.is_already_translated(after):
             return
-        await self.translate_message(after)
+        self.schedule_translation(after)
+
+    def schedule_translation(self, message) -> None:
+        """
+        Debounces fallback translations per message.
+
+        Each new revision of a message cancels the pending or in-flight translation
+        of the previous one, so a message edited many times in quick succession is
+        translated once, in its final state. Revisions already handled are skipped.
+        """
+        revision = self.fingerprint(message.content, message.embeds)
+        if (message.id, revision) in self.processed_revisions:
+            return
+        previous = self.pending_translations.pop(message.id, None)
+        if previous is not None:
+            previous.cancel()
+            self.superseded += 1
+        self.pending_translations[message.id] = asyncio.create_task(self.debounced_translation(message, revision))
+
+    async def debounced_translation(self, message, revision) -> None:
+        try:
+            await asyncio.sleep(translate_debounce)
+            self.processed_revisions.add((message.id, revision))
+            await self.translate_message(message)
+        finally:
+            if self.pending_translations.get(message.id) is asyncio.current_task():
+                del self.pending_translations[message.id]
 
     async def translate_message(self, message):
         try:
             mode = self.morphed_channels[message.channel.id]
-            target = MODES[mode]["target"]
-            marker = MODES[mode]["marker"]
-            new_content = None
-            if message.content:
-                new_content = await self.translate(message.content, target) + marker
-            new_embeds = [await self.translate_embed(e, mode) for e in message.embeds] if message.embeds else []
-            await message.edit(content=new_content, embeds=new_embeds or [])
+            new_content, new_embeds = await self.translate_payload(message.content or None, message.embeds, mode)
+            edited = await message.edit(content=new_content, embeds=new_embeds)
+            self.produced.add((edited.id, self.fingerprint(edited.content, edited.embeds)))
+            self.fallback_edits += 1
         except Exception:
             pass
 
@@ -167,6 +851,47 @@ class Become(commands.Cog, name="become"):
             embed = discord.Embed(title="become failed", description=f"'{mode}' isn't a language dummy")
             await ctx.reply(embed=embed)
 
+    @commands.hybrid_command(
+        name="becomestats",
+        description="Show translation cache statistics",
+    )
+    @commands.is_owner()
+    async def becomestats(self, ctx):
+        cache = self.translation_cache
+        embed = discord.Embed(title="become Stats")
+        embed.add_field(
+            name="Translation cache",
+            value=f"Memory: {len(cache.memory)}/{cache.memory_size} entries | SQLite: {'on' if cache.connection else 'off'}\n"
+            f"Memory hits: {cache.memory_hits} | Disk hits: {cache.disk_hits} | Misses: {cache.misses} | Hit rate: {cache.hit_rate():.0%}",
+            inline=False,
+        )
+        embed.add_field(
+            name="Delivery",
+            value=f"Translated before send: {self.presend_translations} | Fallback edits: {self.fallback_edits} | Interaction timeouts: {self.presend_timeouts}",
+            inline=False,
+        )
+        per_message = f"{self.translations / self.bot_messages:.2f}" if self.bot_messages else "n/a"
+        embed.add_field(
+            name="Debouncing",
+            value=f"Translations: {self.translations} | Bot messages: {self.bot_messages} | Per message: {per_message}\n"
+            f"Superseded: {self.superseded} | Pending: {len(self.pending_translations)}",
+            inline=False,
+        )
+        embed.add_field(
+            name="Loop detection",
+            value=f"Registry: {len(self.produced)}/{self.produced.size} entries | Registry hits: {self.registry_hits} | Marker fallback hits: {self.marker_hits}",
+            inline=False,
+        )
+        embed.add_field(
+            name="Segmenting",
+            value=f"Characters seen: {self.chars_seen} | Translatable: {self.chars_sent}"
+            + (f" ({self.chars_sent / self.chars_seen:.0%})" if self.chars_seen else ""),
+            inline=False,
+        )
+        embed.add_field(name="LibreTranslate backends", value=self.backends.describe(), inline=False)
+        embed.add_field(name="Morphed channels", value=str(len(self.morphed_channels)), inline=False)
+        await ctx.reply(embed=embed)
+
     @commands.hybrid_command(
         name="becomelist",
         description="list all available languages to become",
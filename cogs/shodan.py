@@ -1,15 +1,37 @@
+import asyncio
 import base64
+import copy
+import hashlib
+import heapq
 import io
+import itertools
+import json
 import os
 import random
-from typing import Any, Dict, Optional, Tuple, List
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, List
 
 import aiohttp
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 SHODAN_SEARCH_URL = "https://api.shodan.io/shodan/host/search"
 SHODAN_HOST_URL = "https://www.shodan.io/host"
+SHODAN_API_INFO_URL = "https://api.shodan.io/api-info"
+
+SHODAN_CACHE_TTL = float(os.getenv("SHODAN_CACHE_TTL", "3600"))
+SHODAN_CACHE_MAX_BYTES = int(os.getenv("SHODAN_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SHODAN_CACHE_DIR = os.getenv("SHODAN_CACHE_DIR", "")
+SHODAN_CACHE_DISK_MAX_BYTES = int(os.getenv("SHODAN_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+SHODAN_VIEW_MAX_BYTES = int(os.getenv("SHODAN_VIEW_MAX_BYTES", str(32 * 1024 * 1024)))
+SHODAN_MAX_BUFFERED = int(os.getenv("SHODAN_MAX_BUFFERED", "500"))
+SHODAN_MAX_PAGES = int(os.getenv("SHODAN_MAX_PAGES", "10"))
+SHODAN_SCREENSHOT_PAGES = int(os.getenv("SHODAN_SCREENSHOT_PAGES", "1"))
+SHODAN_PAGE_SIZE = 100  # host/search results per API page
+SHODAN_REQUEST_INTERVAL = float(os.getenv("SHODAN_REQUEST_INTERVAL", "1.0"))
+SHODAN_CREDITS_INTERVAL = float(os.getenv("SHODAN_CREDITS_INTERVAL", "600"))
+SHODAN_QUEUE_UPDATE_INTERVAL = float(os.getenv("SHODAN_QUEUE_UPDATE_INTERVAL", "5"))
 
 def _safe_join(items, limit: int = 3) -> str:
     if not items or not isinstance(items, (list, tuple)):
@@ -21,8 +43,7 @@ def _safe_join(items, limit: int = 3) -> str:
         return ", ".join(trimmed[:limit]) + f" (+{len(trimmed) - limit} more)"
     return ", ".join(trimmed)
 
-def _extract_screenshot(match: Dict[str, Any]) -> Optional[Tuple[bytes, str]]:
-    screenshot = match.get("screenshot")
+def _extract_screenshot(screenshot: Optional[Dict[str, Any]]) -> Optional[Tuple[bytes, str]]:
     if not isinstance(screenshot, dict):
         return None
     data_b64 = screenshot.get("data")
@@ -35,9 +56,138 @@ def _extract_screenshot(match: Dict[str, Any]) -> Optional[Tuple[bytes, str]]:
     except Exception:
         return None
 
-def _get_data_str(match: Dict[str, Any]) -> Optional[str]:
-    """Returns the raw data as a string if available, else None."""
-    data = match.get("data")
+def _format_age(seconds: float) -> str:
+    if seconds < 60:
+        return f"{int(seconds)}s"
+    if seconds < 3600:
+        return f"{int(seconds // 60)}m"
+    return f"{seconds / 3600:.1f}h"
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.split()).lower()
+
+def _pop_flag(query: str, flag: str) -> Tuple[str, bool]:
+    """Removes a `flag` token (case-insensitive) from a query, returns (query, found)."""
+    tokens = query.split()
+    kept = [token for token in tokens if token.lower() != flag]
+    return " ".join(kept), len(kept) != len(tokens)
+
+class ShodanResultCache:
+    """
+    TTL cache for host/search responses keyed on the normalized query and page.
+
+    The memory tier is an LRU bounded by the size of the raw responses; with a cache
+    directory set, responses are also kept on disk (bounded separately) so they
+    survive restarts. Only successful responses are cached.
+    """
+
+    def __init__(self, ttl: float, max_bytes: int, directory: str = "", disk_max_bytes: int = 0):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.disk_max_bytes = disk_max_bytes
+        # key -> (stored_at, size, payload)
+        self.entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, page: int = 1) -> str:
+        return hashlib.sha256(f"{_normalize_query(query)}\0{page}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, bytes]]:
+        try:
+            path = self._path(key)
+            stored_at = os.path.getmtime(path)
+            if time.time() - stored_at > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return stored_at, f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, body: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = self._path(key) + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(body)
+        os.replace(temporary, self._path(key))
+        # Drop expired files, then the oldest ones until the directory fits its budget
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if time.time() - stat.st_mtime > self.ttl:
+                os.remove(path)
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def _remember(self, key: str, stored_at: float, size: int, payload: Dict[str, Any]) -> None:
+        if key in self.entries:
+            self.total_bytes -= self.entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (stored_at, size, payload)
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted, _) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted
+
+    async def get(self, query: str, page: int = 1) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Returns (payload, stored_at) for a fresh cached response, or None."""
+        key = self.make_key(query, page)
+        entry = self.entries.get(key)
+        if entry and time.time() - entry[0] <= self.ttl:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], entry[0]
+        if entry:
+            self.total_bytes -= self.entries.pop(key)[1]
+        if self.directory:
+            found = await asyncio.get_running_loop().run_in_executor(None, self._read_disk, key)
+            if found:
+                stored_at, body = found
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    payload = None
+                if isinstance(payload, dict):
+                    self._remember(key, stored_at, len(body), payload)
+                    self.disk_hits += 1
+                    return payload, stored_at
+        self.misses += 1
+        return None
+
+    async def put(self, query: str, page: int, payload: Dict[str, Any], body: bytes) -> None:
+        if self.ttl <= 0:
+            return
+        key = self.make_key(query, page)
+        self._remember(key, time.time(), len(body), payload)
+        if self.directory and self.disk_max_bytes > 0:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self._write_disk, key, body)
+            except OSError:
+                pass
+
+def _get_data_str(data: Any) -> Optional[str]:
+    """Returns a match's raw banner data as a string if available, else None."""
     if not data:
         return None
     if isinstance(data, bytes):
@@ -49,15 +199,129 @@ def _get_data_str(match: Dict[str, Any]) -> Optional[str]:
         data = str(data)
     return data
 
-def _get_concatenated_raw_data_file(matches: List[Dict[str, Any]], base_filename: str, start_idx: int) -> Optional[discord.File]:
+class ShodanMatch:
+    """
+    The rendered fields of one Shodan match.
+
+    Screenshot and banner payloads are kept as references to the original response
+    strings and only decoded when a page is rendered. Their size is tracked in the
+    shared payload budget, which may drop them again (see `_PayloadBudget`). `page`
+    and `index` locate the match in its API response so dropped payloads can be
+    read back from the result cache.
+    """
+
+    __slots__ = (
+        "ip", "port", "org", "product", "asn", "hostnames", "domains", "country",
+        "region", "transport", "timestamp", "hint", "page", "index", "dropped",
+        "_screenshot", "_banner",
+    )
+
+    def __init__(self, match: Dict[str, Any], page: int = 1, index: int = 0):
+        self.ip = match.get("ip_str") or "N/A"
+        self.port = match.get("port") or "N/A"
+        self.org = match.get("org") or match.get("isp") or "N/A"
+        self.product = match.get("product") or "N/A"
+        self.asn = match.get("asn") or "N/A"
+        self.hostnames = _safe_join(match.get("hostnames"))
+        self.domains = _safe_join(match.get("domains"))
+        location = match.get("location") if isinstance(match.get("location"), dict) else {}
+        self.country = location.get("country_name") or location.get("country_code") or "N/A"
+        self.region = location.get("region_code") or location.get("region_name") or "N/A"
+        self.transport = match.get("transport") or "N/A"
+        self.timestamp = match.get("timestamp") or "N/A"
+        self.hint = match.get("city") or match.get("org") or "custom"
+        self.page = page
+        self.index = index
+        self.dropped = False
+        self.load_payloads(match)
+
+    def load_payloads(self, match: Dict[str, Any]) -> None:
+        screenshot = match.get("screenshot")
+        self._screenshot = screenshot if isinstance(screenshot, dict) and screenshot.get("data") else None
+        self._banner = match.get("data") or None
+        self.dropped = False
+
+    @property
+    def has_screenshot(self) -> bool:
+        return self._screenshot is not None
+
+    @property
+    def has_banner(self) -> bool:
+        return self._banner is not None
+
+    @property
+    def payload_size(self) -> int:
+        size = len(self._banner) if self._banner else 0
+        if self._screenshot:
+            size += len(self._screenshot.get("data") or "")
+        return size
+
+    def screenshot_payload(self) -> Optional[Dict[str, Any]]:
+        """The undecoded screenshot, decode it off the event loop with `_extract_screenshot`."""
+        _payload_budget.touch(self)
+        return self._screenshot
+
+    def banner_payload(self) -> Any:
+        _payload_budget.touch(self)
+        return self._banner
+
+    def drop_payloads(self) -> None:
+        self._screenshot = None
+        self._banner = None
+        self.dropped = True
+
+class _PayloadBudget:
+    """
+    Byte budget for screenshot/banner payloads and rendered pages held by all live Shodan views.
+
+    Items are tracked in least-recently-used order; when the budget is exceeded the
+    oldest ones let go of their bytes. Matches drop their payloads (the result cache
+    may still hold the same response, in which case they're read back from it when
+    shown again) and rendered pages are forgotten by their view.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # id(item) -> (item, size, drop)
+        self.entries: "OrderedDict[int, Tuple[Any, int, Callable[[], None]]]" = OrderedDict()
+        self.total_bytes = 0
+        self.evicted = 0
+
+    def track(self, matches: List[ShodanMatch]) -> None:
+        for match in matches:
+            self.add(match, match.payload_size, match.drop_payloads)
+
+    def add(self, item: Any, size: int, drop: Callable[[], None]) -> None:
+        """Counts `size` bytes held by `item`, `drop()` is called to let go of them on eviction."""
+        if size and id(item) not in self.entries:
+            self.entries[id(item)] = (item, size, drop)
+            self.total_bytes += size
+        while self.total_bytes > self.max_bytes and self.entries:
+            _, (_, size, drop) = self.entries.popitem(last=False)
+            drop()
+            self.total_bytes -= size
+            self.evicted += 1
+
+    def touch(self, item: Any) -> None:
+        if id(item) in self.entries:
+            self.entries.move_to_end(id(item))
+
+    def release(self, items: List[Any]) -> None:
+        for item in items:
+            entry = self.entries.pop(id(item), None)
+            if entry:
+                self.total_bytes -= entry[1]
+
+_payload_budget = _PayloadBudget(SHODAN_VIEW_MAX_BYTES)
+
+def _get_concatenated_raw_data(banners: List[Tuple[str, Any, Any]], base_filename: str, start_idx: int) -> Optional[Tuple[str, bytes]]:
     """
-    Returns a discord.File with the concatenated 'data' fields from the given matches.
+    Returns (filename, bytes) of a text file with the concatenated banner data from the given
+    (ip, port, banner payload) entries. Large pages make this slow, run it off the event loop.
     """
     contents = []
-    for idx, match in enumerate(matches, start=start_idx + 1):
-        ip = match.get("ip_str") or "N/A"
-        port = match.get("port") or "N/A"
-        banner = _get_data_str(match)
+    for idx, (ip, port, payload) in enumerate(banners, start=start_idx + 1):
+        banner = _get_data_str(payload)
         header = f"========== [{idx}] {ip}:{port} ==========\n"
         if banner:
             contents.append(header + banner + "\n")
@@ -68,37 +332,193 @@ def _get_concatenated_raw_data_file(matches: List[Dict[str, Any]], base_filename
     # Discord (2024) allows up to 25MB per file, up to 10 attachments.
     # Let's cap raw data size to a few MB to be safe.
     MAX_SIZE = 8 * 1024 * 1024
-    truncated = False
     if len(data_bytes) > MAX_SIZE:
         data_bytes = data_bytes[:MAX_SIZE]
         data_bytes += b"\n... (truncated)\n"
-        truncated = True
     filename_root = base_filename.replace(" ", "_").lower()
     filename = f"{filename_root}_raw_data.txt"
-    fileobj = io.BytesIO(data_bytes)
-    return discord.File(fileobj, filename=filename)
+    return filename, data_bytes
+
+class ShodanResultSource:
+    """
+    Lazily paginated host/search results.
+
+    Starts from the first API page and fetches later ones only as the reader gets near
+    the end of the buffered matches, one page ahead. Stops at the end of the results,
+    after SHODAN_MAX_PAGES pages, or once SHODAN_MAX_BUFFERED matches are buffered.
+
+    `fetch(page, interactive)` is told whether someone is waiting on the page. Speculative
+    prefetches aren't, and when one fails only prefetching stops. `promote()` is called
+    when a reader starts waiting on a prefetch that is still queued.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[int, bool], Awaitable[Tuple[Optional[Dict[str, Any]], Optional[str], Optional[float]]]],
+        payload: Dict[str, Any],
+        screenshots_only: bool = False,
+        max_buffered: int = SHODAN_MAX_BUFFERED,
+        max_pages: int = SHODAN_MAX_PAGES,
+        reload: Optional[Callable[[int], Awaitable[Optional[Dict[str, Any]]]]] = None,
+        promote: Optional[Callable[[], None]] = None,
+    ):
+        self.fetch = fetch
+        self.reload = reload
+        self.promote = promote
+        self.screenshots_only = screenshots_only
+        self.max_buffered = max_buffered
+        self.max_pages = max_pages
+        self.matches: List[ShodanMatch] = []
+        self.total = 0
+        self.pages_fetched = 0
+        self.exhausted = False
+        self.prefetch_failed = False
+        self._pending: Optional[asyncio.Task] = None
+        self._add(payload)
+
+    def _add(self, payload: Optional[Dict[str, Any]]) -> None:
+        self.pages_fetched += 1
+        raw = payload.get("matches") if isinstance(payload, dict) else None
+        if isinstance(payload, dict):
+            self.total = payload.get("total") or self.total
+        if not isinstance(raw, list) or not raw:
+            self.exhausted = True
+            return
+        new = [ShodanMatch(m, self.pages_fetched, i) for i, m in enumerate(raw) if isinstance(m, dict)]
+        new = [m for m in new if m.has_screenshot or not self.screenshots_only]
+        new = new[:self.max_buffered - len(self.matches)]
+        self.matches.extend(new)
+        _payload_budget.track(new)
+        if (
+            len(self.matches) >= self.max_buffered
+            or self.pages_fetched >= self.max_pages
+            or self.pages_fetched * SHODAN_PAGE_SIZE >= self.total
+        ):
+            self.exhausted = True
+
+    async def _fetch_next(self, interactive: bool) -> None:
+        try:
+            payload, error, _ = await self.fetch(self.pages_fetched + 1, interactive)
+        except Exception:
+            payload, error = None, "failed"
+        if error:
+            # A failed prefetch (e.g. out of credits) doesn't stop a reader from asking again
+            if interactive:
+                self.exhausted = True
+            else:
+                self.prefetch_failed = True
+            return
+        self._add(payload)
+
+    async def load_payloads(self, matches: List[ShodanMatch]) -> None:
+        """Reads payloads dropped by the budget back from the result cache, if it still has them."""
+        pages = {m.page for m in matches if m.dropped}
+        if not pages or not self.reload:
+            return
+        for page in pages:
+            payload = await self.reload(page)
+            raw = payload.get("matches") if isinstance(payload, dict) else None
+            if not isinstance(raw, list):
+                continue
+            restored = []
+            for m in matches:
+                if m.dropped and m.page == page and m.index < len(raw) and isinstance(raw[m.index], dict):
+                    m.load_payloads(raw[m.index])
+                    restored.append(m)
+            _payload_budget.track(restored)
+
+    def buffered(self, count: int) -> bool:
+        return len(self.matches) >= count or self.exhausted
+
+    def prefetch(self) -> None:
+        if self.exhausted or self.prefetch_failed or (self._pending and not self._pending.done()):
+            return
+        self._pending = asyncio.create_task(self._fetch_next(False))
+
+    async def ensure(self, count: int, max_pages: Optional[int] = None) -> None:
+        """
+        Fetches pages until `count` matches are buffered or there are no more, or
+        `max_pages` pages have been fetched in total.
+        """
+        while not self.buffered(count) and (max_pages is None or self.pages_fetched < max_pages):
+            if self._pending is None or self._pending.done():
+                self._pending = asyncio.create_task(self._fetch_next(True))
+            elif self.promote:
+                self.promote()
+            pending = self._pending
+            # Waiting this way doesn't raise when the fetch was cancelled by close()
+            await asyncio.wait([pending])
+            if pending.cancelled() or pending.exception() is not None:
+                # Show what is buffered rather than failing the interaction
+                self.exhausted = True
+
+    def count_label(self) -> str:
+        return str(len(self.matches)) if self.exhausted else f"{len(self.matches)}+"
+
+    def close(self) -> None:
+        self.exhausted = True
+        if self._pending:
+            self._pending.cancel()
+        _payload_budget.release(self.matches)
+
+class _RenderedPage:
+    """A page's embed and attachment bytes, ready to be turned into fresh discord objects."""
+
+    __slots__ = ("embed", "footer_prefix", "footer_suffix", "files")
+
+    def __init__(self, embed: Dict[str, Any], footer_prefix: str = "", footer_suffix: str = "", files: Optional[List[Tuple[str, bytes]]] = None):
+        self.embed = embed
+        self.footer_prefix = footer_prefix
+        self.footer_suffix = footer_suffix
+        self.files = files or []
+
+    @property
+    def size(self) -> int:
+        return sum(len(data) for _, data in self.files)
 
 class ShodanPageView(discord.ui.View):
+    # Rendered pages kept per view; pages hold decoded screenshots, so keep this small
+    MAX_RENDERED_PAGES = 8
+
     def __init__(
         self,
         *,
         requester: discord.User,
-        matches: List[Dict[str, Any]],
+        source: ShodanResultSource,
         page_size: int = 10,
         page: int = 0,
         screenshots: bool = False,
         query: str = "",
+        cached_at: Optional[float] = None,
         timeout: float = 120.0,
     ):
         super().__init__(timeout=timeout)
         self.requester_id = getattr(requester, "id", None)
-        self.matches = matches
+        self.source = source
+        self.matches = source.matches
         self.page_size = page_size
         self.page = page
         self.screenshots = screenshots
         self.query = query
+        self.cached_at = cached_at
+        # page -> _RenderedPage, least recently shown first
+        self._rendered: "OrderedDict[int, _RenderedPage]" = OrderedDict()
+        # Rendered pages show the buffered match count, they're dropped when it changes
+        self._rendered_for: Tuple[int, bool] = (len(self.matches), source.exhausted)
+        self._prerender: Optional[asyncio.Task] = None
+        self._prerendering: Optional[int] = None
+        self._closed = False
 
-        self.total_pages = max(1, (len(matches) + page_size - 1) // page_size)
+    @property
+    def total_pages(self) -> int:
+        pages = max(1, (len(self.matches) + self.page_size - 1) // self.page_size)
+        # While more results can be fetched there is always a next page
+        return pages if self.source.exhausted else pages + 1
+
+    def _page_label(self) -> str:
+        if self.source.exhausted:
+            return f"{self.page + 1}/{self.total_pages}"
+        return f"{self.page + 1}/{self.total_pages - 1}+"
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if self.requester_id is not None and interaction.user.id != self.requester_id:
@@ -119,13 +539,12 @@ class ShodanPageView(discord.ui.View):
         await self._update_message(interaction)
 
     async def _update_message(self, interaction: discord.Interaction):
-        for item in self.children:
-            item.disabled = False
-        if self.page <= 0:
-            self.previous_page.disabled = True
-        if self.page >= self.total_pages - 1:
-            self.next_page.disabled = True
-
+        if not self.source.buffered((self.page + 1) * self.page_size):
+            # Fetching another Shodan page can outlast the interaction response deadline
+            await interaction.response.defer()
+            embed, files = await self.format_embed_and_files()
+            await interaction.edit_original_response(embed=embed, attachments=files if files else [], view=self)
+            return
         embed, files = await self.format_embed_and_files()
         await interaction.response.edit_message(
             embed=embed,
@@ -133,148 +552,481 @@ class ShodanPageView(discord.ui.View):
             view=self
         )
 
+    def _cache_note(self) -> str:
+        if self.cached_at is None:
+            return ""
+        return f" | Cached {_format_age(time.time() - self.cached_at)} ago"
+
+    def _update_buttons(self) -> None:
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.total_pages - 1
+
     async def on_timeout(self):
         for item in self.children:
             item.disabled = True
+        self._closed = True
+        if self._prerender:
+            self._prerender.cancel()
+        self._clear_rendered()
+        self.source.close()
+
+    def _store_rendered(self, page: int, rendered: _RenderedPage) -> None:
+        # Rendered bytes count against the same budget as the payloads they were decoded from
+        self._rendered[page] = rendered
+        _payload_budget.add(rendered, rendered.size, lambda: self._forget_rendered(page, rendered))
+        while len(self._rendered) > self.MAX_RENDERED_PAGES:
+            _, oldest = self._rendered.popitem(last=False)
+            _payload_budget.release([oldest])
+
+    def _forget_rendered(self, page: int, rendered: _RenderedPage) -> None:
+        if self._rendered.get(page) is rendered:
+            del self._rendered[page]
+
+    def _clear_rendered(self) -> None:
+        _payload_budget.release(list(self._rendered.values()))
+        self._rendered.clear()
+
+    async def _render_and_store(self, page: int) -> _RenderedPage:
+        rendered_for = self._rendered_for
+        rendered = await self._render_page(page)
+        # Don't keep a render that went stale or outlived the view while it was being made
+        if rendered_for == self._rendered_for and not self._closed:
+            self._store_rendered(page, rendered)
+        return rendered
+
+    async def _get_rendered(self, page: int) -> _RenderedPage:
+        rendered = self._rendered.get(page)
+        if rendered is None and self._prerendering == page and self._prerender and not self._prerender.done():
+            # The page is already being rendered in the background, don't decode it twice
+            await asyncio.wait([self._prerender])
+            rendered = self._rendered.get(page)
+        if rendered is None:
+            return await self._render_and_store(page)
+        self._rendered.move_to_end(page)
+        _payload_budget.touch(rendered)
+        return rendered
+
+    async def _prerender_page(self, page: int) -> None:
+        # Let the current page's response go out first
+        await asyncio.sleep(0)
+        if page not in self._rendered:
+            await self._render_and_store(page)
+            # Prerendering isn't a view, keep the current page the most recent one
+            if self.page in self._rendered:
+                self._rendered.move_to_end(self.page)
 
     async def format_embed_and_files(self) -> Tuple[discord.Embed, Optional[List[discord.File]]]:
         """
         Returns a tuple of (discord.Embed, Optional[List[discord.File]]) for current page.
         Files can be screenshot image and/or raw data .txt.
+
+        Rendered pages are memoized; discord.File objects are single-use, so fresh ones
+        are wrapped around the cached bytes each time. The next page is prerendered in
+        the background, and another Shodan page is fetched when the reader gets close
+        to the end of the buffered matches.
         """
-        start = self.page * self.page_size
+        await self.source.ensure((self.page + 1) * self.page_size)
+        self.page = max(0, min(self.page, self.total_pages - 1))
+        if self._rendered_for != (len(self.matches), self.source.exhausted):
+            self._clear_rendered()
+            self._rendered_for = (len(self.matches), self.source.exhausted)
+
+        rendered = await self._get_rendered(self.page)
+        embed = discord.Embed.from_dict(copy.deepcopy(rendered.embed))
+        embed.set_footer(text=f"{rendered.footer_prefix}Page {self._page_label()}{rendered.footer_suffix}{self._cache_note()}")
+        files = [discord.File(io.BytesIO(data), filename=filename) for filename, data in rendered.files]
+        self._update_buttons()
+
+        # Fetch the next Shodan page once the reader is within a couple of pages of the buffer's end
+        lookahead = max(2 * self.page_size, SHODAN_PAGE_SIZE // 4)
+        if not self.source.buffered((self.page + 1) * self.page_size + lookahead):
+            self.source.prefetch()
+        if self.source.buffered((self.page + 2) * self.page_size) and self.page + 1 < self.total_pages and self.page + 1 not in self._rendered:
+            if self._prerender is None or self._prerender.done():
+                self._prerendering = self.page + 1
+                self._prerender = asyncio.create_task(self._prerender_page(self.page + 1))
+        return embed, files if files else None
+
+    def _page_matches(self, page: int) -> List[ShodanMatch]:
+        start = page * self.page_size
+        return self.matches[start:start + self.page_size]
+
+    async def _render_page(self, page: int) -> _RenderedPage:
+        """Renders one page. Decoding screenshots and joining banners runs in the default executor."""
+        start = page * self.page_size
         end = min(len(self.matches), start + self.page_size)
-        current_matches = self.matches[start:end]
+        current_matches = self._page_matches(page)
+        await self.source.load_payloads(current_matches)
+        loop = asyncio.get_running_loop()
 
         if not self.screenshots:
             desc_lines = []
-            files = []
             # Prepare single concatenated raw data file for this page
             # Use the city/first IP of page for filename root, otherwise fallback.
             if current_matches:
-                sample_ip = current_matches[0].get("ip_str") or "page"
+                sample_ip = current_matches[0].ip
             else:
                 sample_ip = "page"
-            raw_file = _get_concatenated_raw_data_file(current_matches, f"{sample_ip}_{start+1}-{end}", start)
+            banners = [(m.ip, m.port, m.banner_payload()) for m in current_matches]
+            raw_file = await loop.run_in_executor(None, _get_concatenated_raw_data, banners, f"{sample_ip}_{start+1}-{end}", start)
             for idx, m in enumerate(current_matches, start=start + 1):
-                ip = m.get("ip_str") or "N/A"
-                port = m.get("port") or "N/A"
-                org = m.get("org") or m.get("isp") or "N/A"
-                product = m.get("product") or "N/A"
-                asn = m.get("asn") or "N/A"
-                hostnames = _safe_join(m.get("hostnames"))
-                domains = _safe_join(m.get("domains"))
-                location = m.get("location") if isinstance(m.get("location"), dict) else {}
-                country = location.get("country_name") or location.get("country_code") or "N/A"
-                region = location.get("region_code") or location.get("region_name") or "N/A"
                 row = (
-                    f"**{idx}.** [`{ip}:{port}`]({SHODAN_HOST_URL}/{ip}) | {org}, {product}\n"
-                    f"ASN: {asn} | {country}/{region}\n"
-                    f"Hostnames: {hostnames}\nDomains: {domains}\n"
+                    f"**{idx}.** [`{m.ip}:{m.port}`]({SHODAN_HOST_URL}/{m.ip}) | {m.org}, {m.product}\n"
+                    f"ASN: {m.asn} | {m.country}/{m.region}\n"
+                    f"Hostnames: {m.hostnames}\nDomains: {m.domains}\n"
                 )
                 # Link to single data file if it exists and this row has data
-                if raw_file and _get_data_str(m):
-                    row += f"[Download raw data](attachment://{raw_file.filename})\n"
+                if raw_file and m.has_banner:
+                    row += f"[Download raw data](attachment://{raw_file[0]})\n"
                 desc_lines.append(row)
             embed = discord.Embed(
-                title=f"Shodan Results ({start+1}-{end} of {len(self.matches)})",
+                title=f"Shodan Results ({start+1}-{end} of {self.source.count_label()})",
                 description="\n".join(desc_lines) if desc_lines else "No results.",
                 color=discord.Color.blue()
             )
-            embed.set_footer(text=f"Page {self.page + 1}/{self.total_pages} | Query: {self.query}")
-
-            for item in self.children:
-                if isinstance(item, discord.ui.Button):
-                    if item.label.startswith("◀"):
-                        item.disabled = self.page <= 0
-                    elif item.label.startswith("Next"):
-                        item.disabled = self.page >= self.total_pages - 1
-
-            files = [raw_file] if raw_file else []
-            return embed, files if files else None
+            return _RenderedPage(embed.to_dict(), footer_suffix=f" | Query: {self.query}", files=[raw_file] if raw_file else [])
         else:
             match = current_matches[0] if current_matches else None
-            files = []
             if not match:
                 embed = discord.Embed(title="Shodan", description="No screenshot results on this page.")
-                embed.set_footer(text=f"Page {self.page + 1}/{self.total_pages}")
-                for item in self.children:
-                    if isinstance(item, discord.ui.Button):
-                        if item.label.startswith("◀"):
-                            item.disabled = self.page <= 0
-                        elif item.label.startswith("Next"):
-                            item.disabled = self.page >= self.total_pages - 1
-                return embed, None
-            extracted = _extract_screenshot(match)
+                return _RenderedPage(embed.to_dict())
+            screenshot = match.screenshot_payload()
+            extracted = await loop.run_in_executor(None, _extract_screenshot, screenshot) if screenshot else None
             if not extracted:
-                embed = discord.Embed(title="Shodan", description="Failed to decode screenshot.")
-                embed.set_footer(text=f"Page {self.page + 1}/{self.total_pages}")
-                for item in self.children:
-                    if isinstance(item, discord.ui.Button):
-                        if item.label.startswith("◀"):
-                            item.disabled = self.page <= 0
-                        elif item.label.startswith("Next"):
-                            item.disabled = self.page >= self.total_pages - 1
-                return embed, None
+                description = "Screenshot expired from memory, run the command again." if match.dropped else "Failed to decode screenshot."
+                embed = discord.Embed(title="Shodan", description=description)
+                return _RenderedPage(embed.to_dict())
             image_bytes, ext = extracted
-            hint = match.get('city') or match.get('org') or 'custom'
-            filename = f"shodan_{str(hint).lower().replace(' ', '_')}_{start+1}.{ext}"
-            image_file = discord.File(io.BytesIO(image_bytes), filename=filename)
-            files.append(image_file)
-
-            ip = match.get("ip_str") or "N/A"
-            port = match.get("port") or "N/A"
-            org = match.get("org") or match.get("isp") or "N/A"
-            asn = match.get("asn") or "N/A"
-            hostnames = _safe_join(match.get("hostnames"))
-            domains = _safe_join(match.get("domains"))
-            product = match.get("product") or "N/A"
-            transport = match.get("transport") or "N/A"
-            timestamp = match.get("timestamp") or "N/A"
-
-            location = match.get("location") if isinstance(match.get("location"), dict) else {}
-            country = (location.get("country_name") or location.get("country_code") or "N/A") if location else "N/A"
-            region = (location.get("region_code") or location.get("region_name") or "N/A") if location else "N/A"
+            filename = f"shodan_{str(match.hint).lower().replace(' ', '_')}_{start+1}.{ext}"
+            files = [(filename, image_bytes)]
+
+            ip = match.ip
+            port = match.port
 
             # For screenshot mode, keep current behavior: attach corresponding raw data file for the row
             single_raw_file = None
-            if _get_data_str(match):
-                single_raw_file = _get_concatenated_raw_data_file([match], f"{ip}_{port}", start)
+            if match.has_banner:
+                single_raw_file = await loop.run_in_executor(None, _get_concatenated_raw_data, [(ip, port, match.banner_payload())], f"{ip}_{port}", start)
                 if single_raw_file:
                     files.append(single_raw_file)
-            datalink = f"[Download raw data](attachment://{single_raw_file.filename})\n" if single_raw_file else ""
+            datalink = f"[Download raw data](attachment://{single_raw_file[0]})\n" if single_raw_file else ""
 
             embed = discord.Embed(
-                title=f'Shodan Screenshot {start+1} of {len(self.matches)}',
+                title=f'Shodan Screenshot {start+1} of {self.source.count_label()}',
                 description=(
-                    f"Query: `{self.query}`\n[`{ip}:{port}`]({SHODAN_HOST_URL}/{ip}) | {org}\n"
-                    f"Product: {product} | Transport: {transport}\n"
-                    f"ASN: {asn} | {country}/{region}\n"
-                    f"Hostnames: {hostnames}\nDomains: {domains}\n"
+                    f"Query: `{self.query}`\n[`{ip}:{port}`]({SHODAN_HOST_URL}/{ip}) | {match.org}\n"
+                    f"Product: {match.product} | Transport: {match.transport}\n"
+                    f"ASN: {match.asn} | {match.country}/{match.region}\n"
+                    f"Hostnames: {match.hostnames}\nDomains: {match.domains}\n"
                     f"{datalink}"
                 ),
             )
-            embed.set_footer(text=f"Seen: {timestamp} | Page {self.page + 1}/{self.total_pages}")
             embed.set_image(url=f"attachment://{filename}")
+            return _RenderedPage(embed.to_dict(), footer_prefix=f"Seen: {match.timestamp} | ", files=files)
+
+class ShodanClient:
+    """
+    Shared Shodan API client.
+
+    Requests wait in a priority queue and are released at most once per
+    SHODAN_REQUEST_INTERVAL, which keeps concurrent users under Shodan's rate limit.
+    Interactive searches go before background page fetches. Query credits come from
+    api-info, refreshed periodically and estimated in between.
+    """
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
 
-            for item in self.children:
-                if isinstance(item, discord.ui.Button):
-                    if item.label.startswith("◀"):
-                        item.disabled = self.page <= 0
-                    elif item.label.startswith("Next"):
-                        item.disabled = self.page >= self.total_pages - 1
+    def __init__(self, cache: ShodanResultCache, interval: float = SHODAN_REQUEST_INTERVAL):
+        self.cache = cache
+        self.interval = interval
+        # (priority, sequence, future, on_queue, tag) heap of requests waiting for their turn
+        self.queue: List[Tuple[int, int, asyncio.Future, Optional[Callable[[int], None]], Any]] = []
+        self.sequence = itertools.count()
+        self.reported: Dict[int, int] = {}
+        self.wakeup = asyncio.Event()
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.last_request = 0.0
+        self.query_credits: Optional[int] = None
+        self.scan_credits: Optional[int] = None
+        self.plan: Optional[str] = None
+        self.requests = 0
+        self.rate_limited = 0
 
-            return embed, files if files else None
+    def start(self) -> None:
+        self.session = aiohttp.ClientSession()
+        self.dispatcher = asyncio.create_task(self._dispatch())
+
+    async def close(self) -> None:
+        if self.dispatcher:
+            self.dispatcher.cancel()
+        for _, _, future, _, _ in self.queue:
+            future.cancel()
+        self.queue.clear()
+        if self.session:
+            await self.session.close()
+
+    def _waiting(self):
+        return sorted(entry for entry in self.queue if not entry[2].done())
+
+    def _notify_positions(self) -> None:
+        for ahead, (_, sequence, _, on_queue, _) in enumerate(self._waiting()):
+            # Nothing to tell until someone is ahead of a request
+            if on_queue and self.reported.get(sequence, 0) != ahead:
+                self.reported[sequence] = ahead
+                on_queue(ahead)
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            delay = self.last_request + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if not self.queue:
+                continue
+            _, sequence, future, _, _ = heapq.heappop(self.queue)
+            self.reported.pop(sequence, None)
+            if future.done():
+                # The waiter was cancelled, its slot goes to the next request
+                continue
+            self.last_request = time.monotonic()
+            future.set_result(None)
+            self._notify_positions()
+
+    async def _turn(self, priority: int, on_queue: Optional[Callable[[int], None]] = None, tag: Any = None) -> None:
+        """Waits until this request may be sent."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.queue, (priority, next(self.sequence), future, on_queue, tag))
+        self.wakeup.set()
+        # Only worth telling the user when there's someone ahead of them
+        if on_queue and len(self.queue) > 1:
+            self._notify_positions()
+        await future
+
+    def promote(self, tag: Any) -> None:
+        """Moves queued requests made with `tag` up to interactive priority, someone is waiting on them now."""
+        promoted = False
+        for index, (priority, sequence, future, on_queue, entry_tag) in enumerate(self.queue):
+            if entry_tag is tag and priority > self.INTERACTIVE and not future.done():
+                self.queue[index] = (self.INTERACTIVE, sequence, future, on_queue, entry_tag)
+                promoted = True
+        if promoted:
+            heapq.heapify(self.queue)
+            self._notify_positions()
+
+    async def _get(self, url: str, params: Dict[str, Any], priority: int, on_queue=None, tag: Any = None) -> Tuple[int, bytes]:
+        for attempt in range(2):
+            await self._turn(priority, on_queue, tag)
+            self.requests += 1
+            async with self.session.get(url, params=params) as resp:
+                status, body = resp.status, await resp.read()
+            if status != 429 or attempt:
+                break
+            # Someone else is using the key, wait for another slot
+            self.rate_limited += 1
+        return status, body
+
+    async def search(
+        self,
+        key: str,
+        query: str,
+        refresh: bool = False,
+        page: int = 1,
+        priority: int = INTERACTIVE,
+        on_queue: Optional[Callable[[int], None]] = None,
+        tag: Any = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[float]]:
+        """
+        Runs a host/search query for one result page through the result cache.
+        Returns (payload, error, cached_at); cached_at is None for a fresh response.
+        `on_queue(ahead)` is called with the number of requests ahead while waiting,
+        it must not block (see `_QueueNotice`). `tag` lets `promote()` find the request.
+        """
+        if not refresh:
+            cached = await self.cache.get(query, page)
+            if cached:
+                return cached[0], None, cached[1]
+
+        # Filtered queries and pages after the first cost a query credit
+        costs_credit = page > 1 or ":" in query
+        if costs_credit and priority == self.BACKGROUND and self.query_credits == 0:
+            return None, "Out of Shodan query credits.", None
+
+        params = {
+            "key": key,
+            "query": query,
+            "limit": SHODAN_PAGE_SIZE,
+            "page": page,
+        }
+
+        try:
+            status, body = await self._get(SHODAN_SEARCH_URL, params, priority, on_queue, tag)
+            if status != 200:
+                try:
+                    err = json.loads(body)
+                    err_msg = err.get("error") or err.get("message") or str(err)
+                except Exception:
+                    err_msg = body.decode(errors="replace")
+                return None, f"Error from Shodan: `{status}`\n{err_msg}", None
+            payload = json.loads(body)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return None, f"Request failed: `{type(e).__name__}`", None
+
+        if costs_credit and self.query_credits:
+            self.query_credits -= 1
+        if isinstance(payload, dict):
+            await self.cache.put(query, page, payload, body)
+        return payload, None, None
+
+    async def refresh_credits(self, key: str) -> None:
+        status, body = await self._get(SHODAN_API_INFO_URL, {"key": key}, self.BACKGROUND)
+        if status != 200:
+            return
+        info = json.loads(body)
+        self.query_credits = info.get("query_credits")
+        self.scan_credits = info.get("scan_credits")
+        self.plan = info.get("plan")
+
+class _QueueNotice:
+    """
+    Shows a waiting search's queue position on its "Please wait..." message.
+
+    Positions arrive as plain callbacks from the client. Only the latest one is shown,
+    at most once per SHODAN_QUEUE_UPDATE_INTERVAL, from a single task per message.
+    `finish()` must be awaited before the final edit, so a delayed position update
+    can never land on top of the results.
+    """
+
+    def __init__(self, msg: discord.Message, render: Callable[[int], discord.Embed], interval: float = SHODAN_QUEUE_UPDATE_INTERVAL):
+        self.msg = msg
+        self.render = render
+        self.interval = interval
+        self.ahead = 0
+        self.shown = 0
+        self.last_edit = 0.0
+        self.editing = False
+        self.done = False
+        self.task: Optional[asyncio.Task] = None
+
+    def update(self, ahead: int) -> None:
+        if self.done:
+            return
+        self.ahead = ahead
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self.done and self.ahead != self.shown:
+            delay = self.last_edit + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            ahead = self.ahead
+            self.last_edit = time.monotonic()
+            self.editing = True
+            try:
+                await self.msg.edit(embed=self.render(ahead))
+            except discord.HTTPException:
+                pass
+            finally:
+                self.editing = False
+            self.shown = ahead
+
+    async def finish(self) -> None:
+        self.done = True
+        if self.task is None:
+            return
+        # An edit already on its way is let through so it can't arrive after ours, a sleeping task is dropped
+        if not self.editing:
+            self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
 
 class Shodan(commands.Cog, name="shodan"):
     def __init__(self, bot) -> None:
         self.bot = bot
+        self.cache = ShodanResultCache(SHODAN_CACHE_TTL, SHODAN_CACHE_MAX_BYTES, SHODAN_CACHE_DIR, SHODAN_CACHE_DISK_MAX_BYTES)
+        self.client = ShodanClient(self.cache)
+
+    async def cog_load(self) -> None:
+        self.client.start()
+        self.credits_task.change_interval(seconds=SHODAN_CREDITS_INTERVAL)
+        self.credits_task.start()
+
+    async def cog_unload(self) -> None:
+        self.credits_task.cancel()
+        await self.client.close()
+
+    @tasks.loop(seconds=600.0)
+    async def credits_task(self) -> None:
+        """
+        Periodically refresh the remaining query credits, searches only estimate them.
+        """
+        key = os.getenv("SHODAN_KEY")
+        if not key:
+            return
+        try:
+            await self.client.refresh_credits(key)
+        except Exception as e:
+            self.bot.logger.warning(f"Failed to refresh Shodan credits: {type(e).__name__}: {e}")
+
+    def _waiting_embed(self, title: str, query: str, ahead: int = 0) -> discord.Embed:
+        description = f"Searching: `{query}`\nPlease wait..."
+        if ahead:
+            description += f"\nQueue position: {ahead + 1} ({ahead} request{'s' if ahead != 1 else ''} ahead)"
+        embed = discord.Embed(title=title, description=description)
+        if self.client.query_credits is not None:
+            embed.set_footer(text=f"Query credits left: {self.client.query_credits}")
+        return embed
+
+    def _queue_notice(self, msg: discord.Message, title: str, query: str) -> _QueueNotice:
+        return _QueueNotice(msg, lambda ahead: self._waiting_embed(title, query, ahead))
+
+    async def _search(self, key: str, query: str, refresh: bool, msg: discord.Message, title: str):
+        """Runs the command's first search, keeping its waiting message up to date until it returns."""
+        notice = self._queue_notice(msg, title, query)
+        try:
+            return await self.client.search(key, query, refresh, on_queue=notice.update)
+        finally:
+            await notice.finish()
+
+    def _source(self, key: str, query: str, refresh: bool, payload: Dict[str, Any], screenshots_only: bool = False) -> ShodanResultSource:
+        tag = object()
+
+        async def fetch(page: int, interactive: bool):
+            # Only speculative prefetches wait behind other users' searches
+            priority = ShodanClient.INTERACTIVE if interactive else ShodanClient.BACKGROUND
+            return await self.client.search(key, query, refresh, page, priority=priority, tag=tag)
+
+        async def reload(page: int):
+            # Only ever from the cache, re-fetching a page for its payloads would cost a credit
+            cached = await self.cache.get(query, page)
+            return cached[0] if cached else None
+        return ShodanResultSource(
+            fetch, payload, screenshots_only=screenshots_only, reload=reload,
+            promote=lambda: self.client.promote(tag),
+        )
+
+    @staticmethod
+    def _no_screenshot_message(source: ShodanResultSource) -> str:
+        if source.exhausted:
+            return "Results found, but none included screenshot data."
+        pages = source.pages_fetched
+        return (
+            f"No screenshot in the first {pages * SHODAN_PAGE_SIZE} results "
+            f"({pages} page{'s' if pages != 1 else ''}). Try a narrower query."
+        )
 
     @commands.hybrid_command(
         name="shodan",
         description='Search Shodan for a city screenshot (query: city:"<city>" has_screenshot:true)',
     )
-    async def shodan(self, ctx, city: str = ""):
+    async def shodan(self, ctx, city: str = "", refresh: bool = False):
         key = os.getenv("SHODAN_KEY")
         if not key:
             embed = discord.Embed(
@@ -294,33 +1046,12 @@ class Shodan(commands.Cog, name="shodan"):
             return
 
         query = f'city:"{city}" has_screenshot:true'
-        embed = discord.Embed(title="Shodan", description=f"Searching: `{query}`\nPlease wait...")
+        embed = self._waiting_embed("Shodan", query)
         msg = await ctx.reply(embed=embed)
 
-        params = {
-            "key": key,
-            "query": query,
-            "limit": 100,
-        }
-
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(SHODAN_SEARCH_URL, params=params) as resp:
-                    if resp.status != 200:
-                        try:
-                            err = await resp.json()
-                            err_msg = err.get("error") or err.get("message") or str(err)
-                        except Exception:
-                            err_msg = await resp.text()
-                        embed = discord.Embed(
-                            title="Shodan",
-                            description=f"Error from Shodan: `{resp.status}`\n{err_msg}",
-                        )
-                        await msg.edit(embed=embed)
-                        return
-                    payload = await resp.json()
-        except Exception as e:
-            embed = discord.Embed(title="Shodan", description=f"Request failed: `{type(e).__name__}`")
+        payload, error, cached_at = await self._search(key, query, refresh, msg, "Shodan")
+        if error:
+            embed = discord.Embed(title="Shodan", description=error)
             await msg.edit(embed=embed)
             return
 
@@ -330,22 +1061,22 @@ class Shodan(commands.Cog, name="shodan"):
             await msg.edit(embed=embed)
             return
 
-        screenshot_matches = [m for m in matches if _extract_screenshot(m)]
-        if not screenshot_matches:
-            embed = discord.Embed(
-                title="Shodan",
-                description="Results found, but none included screenshot data.",
-            )
+        source = self._source(key, query, refresh, payload, screenshots_only=True)
+        # Each page past the first costs a credit, so only look a few pages deep for a screenshot
+        await source.ensure(1, SHODAN_SCREENSHOT_PAGES)
+        if not source.matches:
+            embed = discord.Embed(title="Shodan", description=self._no_screenshot_message(source))
             await msg.edit(embed=embed)
             return
 
         view = ShodanPageView(
             requester=getattr(ctx, "author", getattr(ctx, "user", None)),
-            matches=screenshot_matches,
+            source=source,
             page_size=1,
             page=0,
             screenshots=True,
             query=query,
+            cached_at=cached_at,
         )
         embed, files = await view.format_embed_and_files()
         await msg.edit(embed=embed, attachments=files if files else [], view=view)
@@ -354,7 +1085,7 @@ class Shodan(commands.Cog, name="shodan"):
         name="mcserver",
         description='Search Shodan for public Minecraft servers in a given city (query: city:"<city>" port:25565)',
     )
-    async def mcserver(self, ctx, city: str = ""):
+    async def mcserver(self, ctx, city: str = "", refresh: bool = False):
         key = os.getenv("SHODAN_KEY")
         if not key:
             embed = discord.Embed(
@@ -374,33 +1105,12 @@ class Shodan(commands.Cog, name="shodan"):
             return
 
         query = f'city:"{city}" port:25565'
-        embed = discord.Embed(title="Minecraft Server Finder", description=f"Searching: `{query}`\nPlease wait...")
+        embed = self._waiting_embed("Minecraft Server Finder", query)
         msg = await ctx.reply(embed=embed)
 
-        params = {
-            "key": key,
-            "query": query,
-            "limit": 100,
-        }
-
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(SHODAN_SEARCH_URL, params=params) as resp:
-                    if resp.status != 200:
-                        try:
-                            err = await resp.json()
-                            err_msg = err.get("error") or err.get("message") or str(err)
-                        except Exception:
-                            err_msg = await resp.text()
-                        embed = discord.Embed(
-                            title="Minecraft Server Finder",
-                            description=f"Error from Shodan: `{resp.status}`\n{err_msg}",
-                        )
-                        await msg.edit(embed=embed)
-                        return
-                    payload = await resp.json()
-        except Exception as e:
-            embed = discord.Embed(title="Minecraft Server Finder", description=f"Request failed: `{type(e).__name__}`")
+        payload, error, cached_at = await self._search(key, query, refresh, msg, "Minecraft Server Finder")
+        if error:
+            embed = discord.Embed(title="Minecraft Server Finder", description=error)
             await msg.edit(embed=embed)
             return
 
@@ -413,11 +1123,12 @@ class Shodan(commands.Cog, name="shodan"):
         page_size = 10
         view = ShodanPageView(
             requester=getattr(ctx, "author", getattr(ctx, "user", None)),
-            matches=matches,
+            source=self._source(key, query, refresh, payload),
             page_size=page_size,
             page=0,
             screenshots=False,
             query=query,
+            cached_at=cached_at,
         )
         embed, files = await view.format_embed_and_files()
         await msg.edit(embed=embed, attachments=files if files else [], view=view)
@@ -436,7 +1147,8 @@ class Shodan(commands.Cog, name="shodan"):
             await ctx.reply(embed=embed)
             return
 
-        query_orig = (query or "").strip()
+        # `refresh:true` anywhere in the query bypasses the result cache
+        query_orig, refresh = _pop_flag((query or "").strip(), "refresh:true")
         screenshots = False
         lower_query = query_orig.lower()
         if "show:screenshot" in lower_query:
@@ -453,33 +1165,12 @@ class Shodan(commands.Cog, name="shodan"):
         if screenshots and "has_screenshot:true" not in query.lower():
             query = (query + " has_screenshot:true").strip()
 
-        embed = discord.Embed(title="Shodan", description=f"Searching: `{query}`\nPlease wait...")
+        embed = self._waiting_embed("Shodan", query)
         msg = await ctx.reply(embed=embed)
 
-        params = {
-            "key": key,
-            "query": query,
-            "limit": 100,
-        }
-
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(SHODAN_SEARCH_URL, params=params) as resp:
-                    if resp.status != 200:
-                        try:
-                            err = await resp.json()
-                            err_msg = err.get("error") or err.get("message") or str(err)
-                        except Exception:
-                            err_msg = await resp.text()
-                        embed = discord.Embed(
-                            title="Shodan",
-                            description=f"Error from Shodan: `{resp.status}`\n{err_msg}",
-                        )
-                        await msg.edit(embed=embed)
-                        return
-                    payload = await resp.json()
-        except Exception as e:
-            embed = discord.Embed(title="Shodan", description=f"Request failed: `{type(e).__name__}`")
+        payload, error, cached_at = await self._search(key, query, refresh, msg, "Shodan")
+        if error:
+            embed = discord.Embed(title="Shodan", description=error)
             await msg.edit(embed=embed)
             return
 
@@ -490,22 +1181,21 @@ class Shodan(commands.Cog, name="shodan"):
             return
 
         if screenshots:
-            screenshot_matches = [m for m in matches if _extract_screenshot(m)]
-            if not screenshot_matches:
-                embed = discord.Embed(
-                    title="Shodan",
-                    description="Results found, but none included screenshot data.",
-                )
+            source = self._source(key, query, refresh, payload, screenshots_only=True)
+            await source.ensure(1, SHODAN_SCREENSHOT_PAGES)
+            if not source.matches:
+                embed = discord.Embed(title="Shodan", description=self._no_screenshot_message(source))
                 await msg.edit(embed=embed)
                 return
 
             view = ShodanPageView(
                 requester=getattr(ctx, "author", getattr(ctx, "user", None)),
-                matches=screenshot_matches,
+                source=source,
                 page_size=1,
                 page=0,
                 screenshots=True,
                 query=query_orig,
+                cached_at=cached_at,
             )
             embed, files = await view.format_embed_and_files()
             await msg.edit(embed=embed, attachments=files if files else [], view=view)
@@ -513,11 +1203,12 @@ class Shodan(commands.Cog, name="shodan"):
             page_size = 10
             view = ShodanPageView(
                 requester=getattr(ctx, "author", getattr(ctx, "user", None)),
-                matches=matches,
+                source=self._source(key, query, refresh, payload),
                 page_size=page_size,
                 page=0,
                 screenshots=False,
                 query=query_orig,
+                cached_at=cached_at,
             )
             embed, files = await view.format_embed_and_files()
             await msg.edit(embed=embed, attachments=files if files else [], view=view)